@@ -0,0 +1,337 @@
+"""
+Shared constants and helpers for the Android asset generation scripts.
+
+Imported by create_circular_android_icons.py, generate_splash_screens.py and
+scale_android_icons.py, so build_all.py can run every pass in one interpreter
+with Pillow loaded once.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from PIL import Image
+import numpy as np
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+
+# Base path to Android resources
+BASE_PATH = 'android/app/src/main/res'
+
+# Android icon sizes for different densities
+ICON_SIZES = {
+    'mdpi': 48,
+    'hdpi': 72,
+    'xhdpi': 96,
+    'xxhdpi': 144,
+    'xxxhdpi': 192
+}
+
+# Android splash screen sizes for different densities
+SPLASH_SIZES = {
+    'mdpi': 300,
+    'hdpi': 450,
+    'xhdpi': 600,
+    'xxhdpi': 900,
+    'xxxhdpi': 1200
+}
+
+# PNG zlib level: 6 is the fast default, --release trades encode time for size
+PNG_COMPRESS_LEVEL = 6
+RELEASE_COMPRESS_LEVEL = 9
+
+# When oxipng is installed it recompresses every output, so Pillow only
+# needs the cheapest zlib pass
+OXIPNG_COMPRESS_LEVEL = 1
+OXIPNG_ARGS = ['-o', '4', '--strip', 'all']
+
+# Output formats. Android has loaded lossless WebP with alpha since API 18
+# (minSdk here is 26) and it is typically 25-35% smaller than optimized PNG.
+# A resource may only exist in one format per directory.
+ASSET_FORMATS = ['png', 'webp']
+WEBP_SAVE_ARGS = {'lossless': True, 'quality': 100, 'method': 6}
+
+# Decoders tried when opening a source logo; naming them skips Pillow's
+# probe through every registered plugin
+LOGO_FORMATS = ('PNG', 'JPEG')
+
+# Records of previous outputs, used to skip unchanged icons on re-runs
+STAMP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.stamps')
+CIRCULAR_STAMP_PREFIX = 'circular'
+SCALE_STAMP_PREFIX = 'scale'
+
+def add_common_args(parser, force=True, formats=True, single_density=True):
+    """
+    Add the command line options shared by the asset scripts and build_all.py.
+
+    Args:
+        parser: argparse.ArgumentParser to extend
+        force, formats, single_density: Whether the script supports --force,
+            --format and --single-density (--release is always added)
+    """
+    parser.add_argument('--release', action='store_true',
+                        help=f'Encode PNGs at compress_level={RELEASE_COMPRESS_LEVEL} for release artifacts')
+    if force:
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate icons even if they are up to date')
+    if formats:
+        parser.add_argument('--format', choices=ASSET_FORMATS, default='png',
+                            help='Output format; webp writes lossless WebP instead of PNG')
+    if single_density:
+        parser.add_argument('--single-density', action='store_true',
+                            help='Only generate the largest density and let Android scale it for the others')
+
+def common_argv(args, force=True, formats=True, single_density=True):
+    """
+    Turn parsed add_common_args() options back into an argv list.
+
+    Used by build_all.py to forward its options to each pass's main(); the
+    keyword flags select the options that pass accepts.
+    """
+    argv = ['--release'] if args.release else []
+    if force and args.force:
+        argv.append('--force')
+    if formats:
+        argv += ['--format', args.format]
+    if single_density and args.single_density:
+        argv.append('--single-density')
+    return argv
+
+@lru_cache(maxsize=None)
+def load_logo_cached(path, draft_size=None):
+    """
+    Load a source logo as RGBA, decoding each file once per process.
+
+    Args:
+        path: PNG or JPEG source logo
+        draft_size: Largest size that will be resized from the logo. JPEG
+            sources are then decoded straight at the smallest libjpeg scale
+            (1/2, 1/4, 1/8) that still covers it; ignored for PNG.
+
+    Callers must not modify the returned image in place.
+    """
+    img = Image.open(path, formats=LOGO_FORMATS)
+    if draft_size is not None:
+        img.draft('RGB', (draft_size, draft_size))
+    # Decode now so the first resize() doesn't pay for the lazy load
+    img.load()
+    # Sources are usually RGBA already; only convert (a full-image copy) when not
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    return img
+
+def largest_density(sizes):
+    """
+    Reduce a density -> size map to its highest-density entry.
+
+    Used by --single-density: Android scales the largest bitmap down at
+    runtime for devices with no matching density bucket.
+    """
+    density = max(sizes, key=sizes.get)
+    return {density: sizes[density]}
+
+def warn_stale_densities(sizes, kept, dir_prefix, filenames):
+    """Point out lower-density copies that would shadow the runtime-scaled one."""
+    for density in sizes:
+        if density in kept:
+            continue
+        for filename in filenames:
+            path = os.path.join(BASE_PATH, f'{dir_prefix}{density}', filename)
+            if os.path.exists(path):
+                print(f"⚠ Warning: {path} is still present; delete it so Android scales the {', '.join(kept)} asset")
+
+def png_compress_level(release=False):
+    """zlib level to save PNGs at, given --release and whether oxipng will run."""
+    if shutil.which('oxipng'):
+        return OXIPNG_COMPRESS_LEVEL
+    return RELEASE_COMPRESS_LEVEL if release else PNG_COMPRESS_LEVEL
+
+def save_asset(img, output_path, compress_level=PNG_COMPRESS_LEVEL):
+    """Save an image as PNG or lossless WebP, according to output_path's extension."""
+    if output_path.endswith('.webp'):
+        img.save(output_path, 'WEBP', **WEBP_SAVE_ARGS)
+    else:
+        img.save(output_path, 'PNG', compress_level=compress_level)
+
+def warn_duplicate_resource(output_path):
+    """Flag a same-named resource in another format, which aapt rejects as a duplicate."""
+    base, ext = os.path.splitext(output_path)
+    for fmt in ASSET_FORMATS:
+        other_path = f'{base}.{fmt}'
+        if other_path != output_path and os.path.exists(other_path):
+            print(f"⚠ Warning: {other_path} duplicates the {ext[1:]} resource; delete one of them")
+
+def resize_square(img, size):
+    """
+    Resize an image to size x size.
+
+    Exact integer downscales use Pillow's box reduce(), a fraction of the
+    cost of LANCZOS. Otherwise LANCZOS runs with reducing_gap so any large
+    integer part of the ratio is box-reduced first and the filter only
+    handles the remainder.
+    """
+    if img.width == img.height and img.width % size == 0 and img.width // size >= 2:
+        return img.reduce(img.width // size)
+    return img.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+def cascade_resize(img, sizes):
+    """
+    Resize an image to each of the given sizes, reusing earlier results.
+
+    Sizes are produced largest first. Each one is derived from the smallest
+    earlier result that is an exact multiple of it (so it can be box-reduced),
+    otherwise from the previous, next-larger result.
+
+    Returns:
+        Dict mapping each size to its resized image
+    """
+    resized = {}
+    prev = img
+    for size in sorted(set(sizes), reverse=True):
+        src = next((resized[s] for s in sorted(resized) if s % size == 0 and s // size >= 2), prev)
+        prev = resized[size] = resize_square(src, size)
+    return resized
+
+def blend_over(bg, fg, x, y):
+    """
+    Alpha-composite an RGBA array onto another one in place ("over" operator).
+
+    Args:
+        bg: Destination RGBA uint8 array, modified in place
+        fg: Source RGBA uint8 array
+        x, y: Position of fg's top-left corner in bg (may be negative; fg is clipped)
+    """
+    fy, fx = max(0, -y), max(0, -x)
+    by, bx = max(0, y), max(0, x)
+    h = min(fg.shape[0] - fy, bg.shape[0] - by)
+    w = min(fg.shape[1] - fx, bg.shape[1] - bx)
+    if h <= 0 or w <= 0:
+        return
+
+    src = fg[fy:fy + h, fx:fx + w].astype(np.uint32)
+    dst = bg[by:by + h, bx:bx + w]
+    src_a = src[..., 3:4]
+    dst_a = dst[..., 3:4].astype(np.uint32) * (255 - src_a)
+    out_a = src_a * 255 + dst_a
+    out_rgb = (src[..., :3] * src_a * 255 + dst[..., :3] * dst_a) // np.maximum(out_a, 1)
+    dst[..., :3] = out_rgb
+    dst[..., 3:4] = out_a // 255
+
+def optimize_pngs(paths, filters=None):
+    """
+    Losslessly recompress the finished PNGs with oxipng in a single batch.
+
+    One process handles every file so the spawn cost is paid once.
+
+    Args:
+        paths: Generated files; anything that isn't a PNG is ignored
+        filters: Optional oxipng filter list (e.g. '0') to pin instead of
+            letting oxipng try every row filter
+
+    Returns:
+        True if oxipng ran, False if it is not installed
+    """
+    oxipng = shutil.which('oxipng')
+    if not oxipng:
+        return False
+    paths = [path for path in paths if path.endswith('.png')]
+    if paths:
+        filter_args = ['--filters', filters] if filters is not None else []
+        subprocess.run([oxipng, *OXIPNG_ARGS, *filter_args, *paths], check=True)
+        print(f"✓ Optimized {len(paths)} PNGs with oxipng")
+    return True
+
+def run_jobs(job, tasks, executor=None):
+    """
+    Run job over tasks in worker processes, since encoding is CPU-bound.
+
+    Args:
+        job: Module-level function taking one task
+        tasks: Task tuples
+        executor: Pool to reuse (build_all.py shares one across every pass);
+            a pool just for this call is started when None
+    """
+    if executor is not None:
+        return list(executor.map(job, tasks))
+    with ProcessPoolExecutor() as ex:
+        return list(ex.map(job, tasks))
+
+def stamp_path(output_path, prefix):
+    """
+    Location of the stamp file recording how output_path was produced.
+
+    Each script stamps under its own prefix, since several of them write
+    the same files (the scale pass rewrites the circular icons in place).
+    """
+    digest = hashlib.sha1(os.path.abspath(output_path).encode()).hexdigest()[:12]
+    return os.path.join(STAMP_DIR, f'{prefix}-{os.path.basename(output_path)}-{digest}.stamp')
+
+def _load_stamp(output_path, prefix, mtime=None):
+    """Stamp dict for output_path, if it matches mtime (default: the file's current mtime)."""
+    try:
+        with open(stamp_path(output_path, prefix)) as f:
+            stamp = json.load(f)
+        if mtime is None:
+            mtime = os.path.getmtime(output_path)
+        if stamp['mtime'] == mtime:
+            return stamp
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def read_stamp(output_path, prefix, mtime=None):
+    """
+    Key output_path was last produced with, if the file is unmodified since.
+
+    Args:
+        output_path: Generated file to check
+        prefix: Name of the script that produced the file
+        mtime: Check the stamp against this mtime instead of the file's
+            current one (for a file that was since rewritten in place)
+
+    Returns:
+        The stamped key, or None if there is no valid stamp
+    """
+    stamp = _load_stamp(output_path, prefix, mtime)
+    return stamp['key'] if stamp is not None else None
+
+def rewritten_from(output_path, prefix):
+    """
+    mtime output_path had before the pass stamped under prefix rewrote it in place.
+
+    Returns:
+        The input_mtime recorded by write_stamp, or None if that pass's stamp
+        isn't valid for the file as it is now
+    """
+    stamp = _load_stamp(output_path, prefix)
+    return stamp.get('input_mtime') if stamp is not None else None
+
+def is_up_to_date(output_path, key, prefix):
+    """
+    Check whether output_path was produced by a previous run with the same key.
+
+    Args:
+        output_path: Generated file to check
+        key: JSON-serializable list describing the inputs and settings,
+            including the encode settings
+        prefix: Name of the script that produced the file
+
+    Returns:
+        True if the stamp matches key and the file is unmodified since
+    """
+    return read_stamp(output_path, prefix) == key
+
+def write_stamp(output_path, key, prefix, input_mtime=None):
+    """
+    Record that output_path is now up to date for key.
+
+    Passes that rewrite a file in place pass the file's mtime from before
+    the rewrite as input_mtime; see rewritten_from().
+    """
+    stamp = {'key': key, 'mtime': os.path.getmtime(output_path)}
+    if input_mtime is not None:
+        stamp['input_mtime'] = input_mtime
+    os.makedirs(STAMP_DIR, exist_ok=True)
+    with open(stamp_path(output_path, prefix), 'w') as f:
+        json.dump(stamp, f)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Generate all Android launcher icons and splash screen logos in one run.
+Runs every asset pass in a single interpreter and shares one pool of worker
+processes between them, so Pillow and NumPy are imported once in the parent
+and once per worker rather than once per pass.
+
+Run from the repository root:
+    python scripts/assets/build_all.py [--release] [--force] [--format {png,webp}]
+        [--single-density] [--scale-icons]
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import create_circular_android_icons
+import generate_splash_screens
+import scale_android_icons
+from _common import add_common_args, common_argv
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_common_args(parser)
+    parser.add_argument('--scale-icons', action='store_true',
+                        help='Also run scale_android_icons.py over the generated icons (2x logo, cropped)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with ProcessPoolExecutor() as ex:
+        generate_splash_screens.main(common_argv(args, force=False), ex)
+        print()
+        # Icons the scale pass enlarged are only current if it runs again
+        keep_scaled = ['--keep-scaled'] if args.scale_icons else []
+        create_circular_android_icons.main(common_argv(args) + keep_scaled, ex)
+
+        # Scaling enlarges whatever icons are on disk, so it only runs on request
+        if args.scale_icons:
+            print()
+            scale_android_icons.main(common_argv(args), ex)
+
+if __name__ == '__main__':
+    main()
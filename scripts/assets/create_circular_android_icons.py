@@ -2,80 +2,209 @@
 """
 Create circular Android icons with black background and white RUNSTR logo.
 This ensures the logo fits perfectly in Android's circular adaptive icon mask.
+
+Requires Pillow-SIMD for vectorized LANCZOS resampling (see requirements-assets.txt):
+    pip uninstall -y pillow
+    CC="cc -mavx2" pip install -r scripts/assets/requirements-assets.txt
 """
 
-from PIL import Image, ImageDraw
+import argparse
+from functools import lru_cache
+from PIL import Image
+import numpy as np
 import os
 
-# Source RUNSTR logo
-SOURCE_LOGO = os.path.expanduser('~/Desktop/RUNSTR LOGO FINAL/expo/icon.png')
+from _common import (
+    BASE_PATH, CIRCULAR_STAMP_PREFIX, ICON_SIZES, PNG_COMPRESS_LEVEL, SCALE_STAMP_PREFIX,
+    add_common_args, blend_over, cascade_resize, is_up_to_date, largest_density,
+    load_logo_cached, optimize_pngs, png_compress_level, read_stamp, rewritten_from,
+    run_jobs, save_asset, warn_duplicate_resource, warn_stale_densities, write_stamp,
+)
 
-# Android icon sizes for different densities
-ICON_SIZES = {
-    'mdpi': 48,
-    'hdpi': 72,
-    'xhdpi': 96,
-    'xxhdpi': 144,
-    'xxxhdpi': 192
-}
+# Numba JIT-compiles the whole compose step into one fused pixel loop;
+# the NumPy path below is used when it isn't installed
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
-# Base path to Android resources
-BASE_PATH = 'android/app/src/main/res'
+# Source RUNSTR logo
+SOURCE_LOGO = os.path.expanduser('~/Desktop/RUNSTR LOGO FINAL/expo/icon.png')
 
 # Adaptive icon safe zone is the center 66% (circular mask)
 # Using 72% to make logo more prominent (20% larger than 60%)
 LOGO_SCALE = 0.72  # Logo takes 72% of canvas (60% * 1.2 = 72%)
 
-def create_circular_icon(source_path, output_path, size, is_round=False):
+# Icons are black + white with antialiased edges, so most have few enough
+# distinct RGBA values to store exactly as PNG8 (1 byte/pixel). Icons with
+# more colors than a PNG palette holds are written as RGBA instead.
+ICON_PALETTE_COLORS = 256
+
+# Pillow already writes paletted PNGs with row filter 0 (None), which suits
+# the flat black background; pin oxipng to it as well so it skips trying
+# every filter on tiny icons where the search costs more than it saves
+ICON_PNG_FILTERS = '0'
+
+@lru_cache(maxsize=None)
+def circle_alpha(size):
+    """
+    Antialiased circular alpha mask filling a size x size square.
+
+    Computed with a single vectorized distance test instead of rasterizing
+    an ellipse, and cached so each size is built once per process.
+    """
+    yy, xx = np.ogrid[:size, :size]
+    r = (size - 1) / 2
+    d2 = (xx - r) ** 2 + (yy - r) ** 2
+    alpha = np.clip((r + 0.5 - np.sqrt(d2)) * 255, 0, 255).astype(np.uint8)
+    alpha.setflags(write=False)
+    return alpha
+
+if njit is not None:
+    # Single-threaded on purpose: icons are at most 192px, and numba's
+    # parallel threading layer is not fork-safe with the encode process pool
+    @njit(cache=True)
+    def _compose_kernel(logo, alpha, offset, is_round, out):
+        """
+        Fused circle background + logo "over" blend + optional round mask.
+
+        Same arithmetic as blend_over on a black circle, one pass per pixel.
+        """
+        size = out.shape[0]
+        logo_h, logo_w = logo.shape[0], logo.shape[1]
+        for y in range(size):
+            for x in range(size):
+                bg_a = np.int64(alpha[y, x])
+                ly, lx = y - offset, x - offset
+                src_a = np.int64(0)
+                if 0 <= ly < logo_h and 0 <= lx < logo_w:
+                    src_a = np.int64(logo[ly, lx, 3])
+                out_a = src_a * 255 + bg_a * (255 - src_a)
+                for c in range(3):
+                    if src_a > 0:
+                        out[y, x, c] = np.int64(logo[ly, lx, c]) * src_a * 255 // out_a
+                    else:
+                        out[y, x, c] = 0
+                a = out_a // 255
+                if is_round:
+                    a = min(a, bg_a)
+                out[y, x, 3] = a
+
+def create_circular_icon(logo_img, size, is_round=False, out=None):
     """
     Create a circular Android icon with black background and white RUNSTR logo.
 
     Args:
-        source_path: Path to the source RUNSTR logo
-        output_path: Path to save the circular icon
+        logo_img: RUNSTR logo already resized to int(size * LOGO_SCALE)
         size: Target size (e.g., 48, 72, 96, 144, 192)
         is_round: If True, apply circular mask to entire icon
+        out: Optional preallocated (size, size, 4) uint8 view to compose into
+
+    Returns:
+        The composed RGBA icon as a uint8 array (``out`` if given)
     """
-    # Create a new transparent canvas
-    canvas = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(canvas)
+    alpha = circle_alpha(size)
+    rgba = np.zeros((size, size, 4), np.uint8) if out is None else out
 
-    # Draw black circle background
-    draw.ellipse([0, 0, size - 1, size - 1], fill='#000000', outline=None)
+    # Calculate position to center the logo
+    logo_size = logo_img.width
+    offset = (size - logo_size) // 2
 
-    # Load and prepare the RUNSTR logo
-    logo = Image.open(source_path).convert('RGBA')
+    if njit is not None:
+        _compose_kernel(np.asarray(logo_img), alpha, offset, is_round, rgba)
+        return rgba
 
-    # Calculate logo size (60% of canvas to fit within safe zone)
-    logo_size = int(size * LOGO_SCALE)
-    logo_resized = logo.resize((logo_size, logo_size), Image.Resampling.LANCZOS)
+    # Black circle background on a transparent canvas
+    rgba[..., :3] = 0
+    rgba[..., 3] = alpha
 
-    # Calculate position to center the logo
-    position = ((size - logo_size) // 2, (size - logo_size) // 2)
-
-    # Paste logo onto black circle
-    canvas.paste(logo_resized, position, logo_resized)
+    # Blend logo onto black circle
+    blend_over(rgba, np.asarray(logo_img), offset, offset)
 
     # For round icons, apply circular mask to the entire result
     if is_round:
-        # Create circular mask
-        mask = Image.new('L', (size, size), 0)
-        mask_draw = ImageDraw.Draw(mask)
-        mask_draw.ellipse([0, 0, size - 1, size - 1], fill=255)
+        # Reuse the background circle as the mask. Clamp rather than multiply:
+        # the background alpha already is this mask, so multiplying would
+        # square the antialiased edge
+        np.minimum(rgba[..., 3], alpha, out=rgba[..., 3])
+
+    return rgba
 
-        # Apply mask
-        output_img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-        output_img.paste(canvas, (0, 0), mask)
-        canvas = output_img
+def palettize(rgba, max_colors=ICON_PALETTE_COLORS):
+    """
+    Losslessly convert an RGBA icon to a paletted image.
+
+    Returns:
+        A mode P image with alpha in its palette (tRNS chunk), or None if
+        the icon has more than max_colors distinct RGBA values
+    """
+    pixels = np.ascontiguousarray(rgba)
+    colors, index = np.unique(pixels.view(np.uint32).reshape(-1), return_inverse=True)
+    if len(colors) > max_colors:
+        return None
 
-    # Save with optimization
-    canvas.save(output_path, 'PNG', optimize=True)
+    entries = colors.view(np.uint8).reshape(-1, 4)
+    height, width = pixels.shape[:2]
+    img = Image.frombytes('P', (width, height), index.astype(np.uint8).tobytes())
+    img.putpalette(entries[:, :3].tobytes())
+    img.info['transparency'] = entries[:, 3].tobytes()
+    return img
 
+def save_icon(rgba, output_path, is_round=False, compress_level=PNG_COMPRESS_LEVEL):
+    """
+    Encode a composed icon to PNG or WebP.
+
+    Args:
+        rgba: Composed RGBA icon from create_circular_icon
+        output_path: Path to save the circular icon
+        is_round: Whether this is the round variant (for the log line)
+        compress_level: zlib compression level for the PNG encoder
+    """
+    # Store PNGs as PNG8 when the exact colors fit in a palette. Lossless
+    # WebP builds its own palette, so it always gets the RGBA image.
+    canvas = palettize(rgba) if output_path.endswith('.png') else None
+    if canvas is None:
+        canvas = Image.fromarray(rgba)
+
+    # Save at the requested zlib level (optimize=True is far slower for little gain)
+    save_asset(canvas, output_path, compress_level)
+
+    size = canvas.width
     density = os.path.basename(os.path.dirname(output_path))
     icon_type = "round" if is_round else "standard"
     print(f"✓ Created circular {icon_type} icon for {density} - {size}x{size}px")
 
-def main():
+def _job(task):
+    """Process pool entry point: unpack a task tuple into save_icon."""
+    save_icon(*task)
+
+def icon_up_to_date(output_path, key, keep_scaled=False):
+    """
+    Check whether output_path still holds this script's output for key.
+
+    An icon that scale_android_icons.py has since enlarged in place only
+    counts if keep_scaled is set, so running without the scale pass
+    restores the unscaled icon.
+    """
+    scaled_from = rewritten_from(output_path, SCALE_STAMP_PREFIX)
+    if scaled_from is None:
+        return is_up_to_date(output_path, key, CIRCULAR_STAMP_PREFIX)
+    # Check our stamp against the icon the scale pass started from
+    return keep_scaled and read_stamp(output_path, CIRCULAR_STAMP_PREFIX, scaled_from) == key
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_common_args(parser)
+    parser.add_argument('--keep-scaled', action='store_true',
+                        help='Treat icons scale_android_icons.py enlarged in place as up to date '
+                             '(passed by build_all.py --scale-icons)')
+    return parser.parse_args(argv)
+
+def main(argv=None, executor=None):
+    args = parse_args(argv)
+    compress_level = png_compress_level(args.release)
+    icon_sizes = largest_density(ICON_SIZES) if args.single_density else ICON_SIZES
+
     if not os.path.exists(SOURCE_LOGO):
         print(f"❌ Error: Source logo not found at {SOURCE_LOGO}")
         return
@@ -86,21 +215,58 @@ def main():
     print("   - White RUNSTR logo at 60% scale (fits within 66% safe zone)")
     print("   - Transparent corners for adaptive icon system\n")
 
-    # Generate icons for all densities
-    for density, size in ICON_SIZES.items():
+    # Collect icons for all densities
+    icon_names = [f'ic_launcher.{args.format}', f'ic_launcher_round.{args.format}']
+    source_mtime = os.path.getmtime(SOURCE_LOGO)
+    icons = []
+    for density, size in icon_sizes.items():
         mipmap_dir = os.path.join(BASE_PATH, f'mipmap-{density}')
-
-        # Standard launcher icon
-        standard_path = os.path.join(mipmap_dir, 'ic_launcher.png')
-        if os.path.exists(mipmap_dir):
-            create_circular_icon(SOURCE_LOGO, standard_path, size, is_round=False)
-        else:
+        if not os.path.exists(mipmap_dir):
             print(f"⚠ Warning: {mipmap_dir} not found, skipping...")
+            continue
+
+        # Standard launcher icon, then round launcher icon (with circular mask applied)
+        for icon_name, is_round in zip(icon_names, [False, True]):
+            output_path = os.path.join(mipmap_dir, icon_name)
+            warn_duplicate_resource(output_path)
+            key = [source_mtime, LOGO_SCALE, size, is_round,
+                   compress_level, ICON_PALETTE_COLORS, 'exact']
+            if not args.force and icon_up_to_date(output_path, key, args.keep_scaled):
+                print(f"✓ {output_path} is up to date, skipping...")
+            else:
+                icons.append((size, output_path, is_round, key))
+
+    # Load the logo once and resize it once per icon size; the standard and
+    # round variants of a density share the same resized bitmap. Sizes are
+    # cascaded from largest to smallest so each resample works on the
+    # previous (smaller) result instead of the full-resolution source.
+    resized = {}
+    if icons:
+        logo_sizes = {size: int(size * LOGO_SCALE) for size in icon_sizes.values()}
+        logo = load_logo_cached(SOURCE_LOGO, max(logo_sizes.values()))
+        logos = cascade_resize(logo, logo_sizes.values())
+        resized = {size: logos[logo_size] for size, logo_size in logo_sizes.items()}
+
+    # Compose every icon into one contiguous buffer (a single allocation),
+    # each in the top-left corner of its own slot
+    max_size = max(icon_sizes.values())
+    buf = np.zeros((len(icons), max_size, max_size, 4), np.uint8)
+    tasks = []
+    for i, (size, output_path, is_round, _) in enumerate(icons):
+        rgba = create_circular_icon(resized[size], size, is_round, out=buf[i, :size, :size])
+        tasks.append((rgba, output_path, is_round, compress_level))
+
+    # Encoding is independent and CPU-bound, so fan out across processes
+    run_jobs(_job, tasks, executor)
+
+    optimize_pngs([task[1] for task in tasks], filters=ICON_PNG_FILTERS)
+
+    # Stamp after optimizing, since oxipng rewrites the files
+    for _, output_path, _, key in icons:
+        write_stamp(output_path, key, CIRCULAR_STAMP_PREFIX)
 
-        # Round launcher icon (with circular mask applied)
-        round_path = os.path.join(mipmap_dir, 'ic_launcher_round.png')
-        if os.path.exists(mipmap_dir):
-            create_circular_icon(SOURCE_LOGO, round_path, size, is_round=True)
+    if args.single_density:
+        warn_stale_densities(ICON_SIZES, icon_sizes, 'mipmap-', icon_names)
 
     print("\n✅ All circular Android icons created successfully!")
     print("🎯 Benefits:")
@@ -2,78 +2,174 @@
 """
 Generate Android splash screen logos from the RUNSTR logo at multiple densities.
 Replaces the old white "R" with the full RUNSTR logo.
+
+Requires Pillow-SIMD for vectorized LANCZOS resampling (see requirements-assets.txt):
+    pip uninstall -y pillow
+    CC="cc -mavx2" pip install -r scripts/assets/requirements-assets.txt
 """
 
-from PIL import Image
+import argparse
+import numpy as np
 import os
 
+from _common import (
+    BASE_PATH, PNG_COMPRESS_LEVEL, SPLASH_SIZES, WEBP_SAVE_ARGS, add_common_args,
+    cascade_resize, largest_density, load_logo_cached, optimize_pngs, png_compress_level,
+    run_jobs, save_asset, warn_duplicate_resource, warn_stale_densities,
+)
+
+# OpenCV's PNG encoder is considerably faster than Pillow's; fall back to
+# Pillow when it isn't installed
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# libvips runs load + resize + encode as one threaded pipeline; optional,
+# and preferred over Pillow/OpenCV when installed
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
 # Source RUNSTR logo
 SOURCE_LOGO = os.path.expanduser('~/Desktop/RUNSTR LOGO FINAL/expo/splash-icon.png')
 
-# Android splash screen sizes for different densities
-SPLASH_SIZES = {
-    'mdpi': 300,
-    'hdpi': 450,
-    'xhdpi': 600,
-    'xxhdpi': 900,
-    'xxxhdpi': 1200
-}
-
-# Base path to Android resources
-BASE_PATH = 'android/app/src/main/res'
-
-def generate_splash_logo(source_path, output_path, size):
+def generate_splash_logo(img_resized, output_path, size, compress_level=PNG_COMPRESS_LEVEL):
     """
     Generate a splash screen logo at the specified size.
 
     Args:
-        source_path: Path to the source RUNSTR logo
+        img_resized: RUNSTR logo already resized to size x size
         output_path: Path to save the resized splash logo
         size: Target size (square, e.g., 300, 450, 600, etc.)
+        compress_level: zlib compression level for the PNG encoder
     """
-    # Open source logo
-    img = Image.open(source_path)
+    # Save at the requested zlib level (optimize=True is far slower for little gain)
+    if cv2 is not None and output_path.endswith('.png'):
+        bgra = cv2.cvtColor(np.asarray(img_resized), cv2.COLOR_RGBA2BGRA)
+        if not cv2.imwrite(output_path, bgra, [cv2.IMWRITE_PNG_COMPRESSION, compress_level]):
+            raise IOError(f"Failed to write {output_path}")
+    else:
+        save_asset(img_resized, output_path, compress_level)
 
-    # Convert to RGBA if needed
-    if img.mode != 'RGBA':
-        img = img.convert('RGBA')
+    density = os.path.basename(os.path.dirname(output_path))
+    print(f"✓ Generated splash logo for {density} - {size}x{size}px")
+
+def load_logo_vips(source_path):
+    """
+    Decode the source logo once with libvips, ready for resizing.
 
-    # Resize to target size with high-quality resampling
-    img_resized = img.resize((size, size), Image.Resampling.LANCZOS)
+    Returns:
+        The logo as premultiplied RGBA, held in memory so every size reuses it
+    """
+    img = pyvips.Image.new_from_file(source_path)
+
+    # Match the Pillow path: always write 8-bit RGBA. colourspace() also
+    # rescales 16-bit (rgb16/grey16) sources, alpha included, to 8 bits.
+    img = img.colourspace('srgb')
+    if img.format != 'uchar':
+        img = img.cast('uchar')
+    if not img.hasalpha():
+        img = img.bandjoin(255)
+
+    # Resize in premultiplied space so transparent pixels don't bleed into the edges
+    return img.premultiply().copy_memory()
+
+def resize_logo_vips(logo, size):
+    """Resize a load_logo_vips() logo to size x size, back as straight RGBA uchar."""
+    img = logo.resize(size / logo.width, vscale=size / logo.height, kernel='lanczos3')
+    # Round, rather than truncate, the float unpremultiplied values
+    return img.unpremultiply().rint().cast('uchar').copy_memory()
+
+def generate_splash_logo_vips(img, output_path, size, compress_level=PNG_COMPRESS_LEVEL):
+    """
+    Save a splash screen logo with libvips.
 
-    # Save with optimization
-    img_resized.save(output_path, 'PNG', optimize=True)
+    Args:
+        img: RUNSTR logo already resized to size x size by resize_logo_vips
+        output_path: Path to save the resized splash logo
+        size: Target size (square, e.g., 300, 450, 600, etc.)
+        compress_level: zlib compression level for the PNG encoder
+    """
+    if output_path.endswith('.webp'):
+        img.webpsave(output_path, lossless=True, Q=WEBP_SAVE_ARGS['quality'],
+                     effort=WEBP_SAVE_ARGS['method'])
+    else:
+        img.pngsave(output_path, compression=compress_level)
 
     density = os.path.basename(os.path.dirname(output_path))
     print(f"✓ Generated splash logo for {density} - {size}x{size}px")
 
-def main():
+def _job(task):
+    """Process pool entry point: unpack a task tuple into generate_splash_logo."""
+    generate_splash_logo(*task)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_common_args(parser, force=False)
+    return parser.parse_args(argv)
+
+def main(argv=None, executor=None):
+    args = parse_args(argv)
+    compress_level = png_compress_level(args.release)
+    splash_sizes = largest_density(SPLASH_SIZES) if args.single_density else SPLASH_SIZES
+
     if not os.path.exists(SOURCE_LOGO):
         print(f"❌ Error: Source logo not found at {SOURCE_LOGO}")
         return
 
     print("🎨 Generating Android splash screen logos from RUNSTR logo...\n")
 
-    # Generate for both regular and dark mode
-    for density, size in SPLASH_SIZES.items():
+    # Collect outputs for both regular and dark mode
+    logo_name = f'splashscreen_logo.{args.format}'
+    outputs = []
+    for density, size in splash_sizes.items():
         # Regular mode
         regular_dir = os.path.join(BASE_PATH, f'drawable-{density}')
-        regular_path = os.path.join(regular_dir, 'splashscreen_logo.png')
+        regular_path = os.path.join(regular_dir, logo_name)
 
         if os.path.exists(regular_dir):
-            generate_splash_logo(SOURCE_LOGO, regular_path, size)
+            warn_duplicate_resource(regular_path)
+            outputs.append((regular_path, size))
         else:
             print(f"⚠ Warning: {regular_dir} not found, skipping...")
 
         # Dark mode
         dark_dir = os.path.join(BASE_PATH, f'drawable-night-{density}')
-        dark_path = os.path.join(dark_dir, 'splashscreen_logo.png')
+        dark_path = os.path.join(dark_dir, logo_name)
 
         if os.path.exists(dark_dir):
-            generate_splash_logo(SOURCE_LOGO, dark_path, size)
+            warn_duplicate_resource(dark_path)
+            outputs.append((dark_path, size))
         else:
             print(f"⚠ Warning: {dark_dir} not found, skipping...")
 
+    if pyvips is not None:
+        # Decode once and resize once per size (regular and dark mode share
+        # it); libvips parallelizes each operation internally, so run in turn
+        logo = load_logo_vips(SOURCE_LOGO)
+        resized = {size: resize_logo_vips(logo, size) for size in splash_sizes.values()}
+        for output_path, size in outputs:
+            generate_splash_logo_vips(resized[size], output_path, size, compress_level)
+    else:
+        # Open source logo as RGBA (JPEG sources decode at reduced scale)
+        img = load_logo_cached(SOURCE_LOGO, max(splash_sizes.values()))
+
+        # Resize the source once to the largest size, then cascade each smaller
+        # size from an earlier result so every resample runs on a smaller bitmap
+        resized = cascade_resize(img, splash_sizes.values())
+
+        # Each output is independent and CPU-bound, so fan out across processes
+        tasks = [(resized[size], output_path, size, compress_level) for output_path, size in outputs]
+        run_jobs(_job, tasks, executor)
+
+    optimize_pngs([output_path for output_path, _ in outputs])
+
+    if args.single_density:
+        for dir_prefix in ['drawable-', 'drawable-night-']:
+            warn_stale_densities(SPLASH_SIZES, splash_sizes, dir_prefix, [logo_name])
+
     print("\n✅ All splash screen logos generated successfully!")
     print("🚀 The splash screen will now show the full RUNSTR logo on a black background.")
     print("📱 Rebuild the Android app to see the updated splash screen.")
@@ -2,37 +2,48 @@
 """
 Scale up Android app icons to make the RUNSTR logo appear larger in the circular mask.
 This script enlarges the logo by 2x while keeping it centered on a transparent background.
+
+Requires Pillow-SIMD for vectorized LANCZOS resampling (see requirements-assets.txt):
+    pip uninstall -y pillow
+    CC="cc -mavx2" pip install -r scripts/assets/requirements-assets.txt
 """
 
+import argparse
 from PIL import Image
 import os
 
-# Define the mipmap densities and their icon sizes
-DENSITIES = {
-    'mdpi': 48,
-    'hdpi': 72,
-    'xhdpi': 96,
-    'xxhdpi': 144,
-    'xxxhdpi': 192
-}
+from _common import (
+    BASE_PATH, ICON_SIZES, PNG_COMPRESS_LEVEL, SCALE_STAMP_PREFIX, add_common_args,
+    largest_density, optimize_pngs, png_compress_level, read_stamp, rewritten_from,
+    run_jobs, save_asset, write_stamp,
+)
 
 # Scale factor - make logo 2x larger
 SCALE_FACTOR = 2.0
 
-def scale_icon(input_path, output_path, canvas_size):
+# Icons are only ever PNG or WebP; naming the decoders skips Pillow's format probe
+ICON_FORMATS = ('PNG', 'WEBP')
+
+def scale_icon(input_path, output_path, canvas_size, compress_level=PNG_COMPRESS_LEVEL,
+               scale_factor=SCALE_FACTOR):
     """
     Scale up an icon to make the logo more prominent.
 
     Args:
-        input_path: Path to the input PNG file
-        output_path: Path to save the scaled PNG file
+        input_path: Path to the input PNG or WebP file
+        output_path: Path to save the scaled PNG or WebP file
         canvas_size: The target canvas size (e.g., 48, 72, 96, etc.)
+        compress_level: zlib compression level for the PNG encoder
+        scale_factor: How much to enlarge the logo; 1.0 only re-encodes
     """
-    # Open the original icon
-    img = Image.open(input_path).convert('RGBA')
+    # Open the original icon, converting only if it isn't RGBA already
+    img = Image.open(input_path, formats=ICON_FORMATS)
+    img.load()
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
 
-    # Calculate the new size for the logo (scaled up by SCALE_FACTOR)
-    new_size = int(canvas_size * SCALE_FACTOR)
+    # Calculate the new size for the logo (scaled up by scale_factor)
+    new_size = int(canvas_size * scale_factor)
 
     # Resize the logo to be larger
     img_scaled = img.resize((new_size, new_size), Image.Resampling.LANCZOS)
@@ -43,31 +54,77 @@ def scale_icon(input_path, output_path, canvas_size):
     # Calculate position to center the scaled logo (it will extend beyond edges)
     offset = (canvas_size - new_size) // 2
 
-    # Paste the scaled logo onto the canvas (centered, will be cropped by edges)
-    canvas.paste(img_scaled, (offset, offset), img_scaled)
+    # Composite the scaled logo onto the canvas in one pass (centered, cropped
+    # by the edges). The 4-tuple source box selects just the visible region,
+    # so no full-size intermediate layer is needed; Pillow-SIMD vectorizes
+    # alpha_composite.
+    start = max(-offset, 0)
+    extent = min(new_size, canvas_size)
+    dest = (max(offset, 0),) * 2
+    source = (start, start, start + extent, start + extent)
+    canvas.alpha_composite(img_scaled, dest=dest, source=source)
 
     # Save the result
-    canvas.save(output_path, 'PNG', optimize=True)
+    save_asset(canvas, output_path, compress_level)
     print(f"✓ Scaled {os.path.basename(input_path)} - {canvas_size}x{canvas_size}px")
 
-def main():
-    # Base path to Android resources
-    base_path = 'android/app/src/main/res'
+def _job(task):
+    """Process pool entry point: unpack a task tuple into scale_icon."""
+    scale_icon(*task)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_common_args(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None, executor=None):
+    args = parse_args(argv)
+    compress_level = png_compress_level(args.release)
+    icon_sizes = largest_density(ICON_SIZES) if args.single_density else ICON_SIZES
 
     print("🔧 Scaling Android app icons to make RUNSTR logo larger...\n")
 
-    # Process each density
-    for density, size in DENSITIES.items():
-        mipmap_dir = os.path.join(base_path, f'mipmap-{density}')
+    # Collect icons for each density
+    tasks = []
+    stamps = []
+    for density, size in icon_sizes.items():
+        mipmap_dir = os.path.join(BASE_PATH, f'mipmap-{density}')
 
-        # Process both regular and round icons
-        for icon_name in ['ic_launcher.png', 'ic_launcher_round.png']:
-            icon_path = os.path.join(mipmap_dir, icon_name)
+        # Process both regular and round icons in the requested format; a
+        # leftover copy in the other format is not the one being built
+        for icon_name in ['ic_launcher', 'ic_launcher_round']:
+            icon_path = os.path.join(mipmap_dir, f'{icon_name}.{args.format}')
 
-            if os.path.exists(icon_path):
-                scale_icon(icon_path, icon_path, size)
-            else:
+            if not os.path.exists(icon_path):
                 print(f"⚠ Warning: {icon_path} not found, skipping...")
+                continue
+
+            scale_key = [SCALE_FACTOR, size]
+            key = scale_key + [compress_level]
+            stamped = None if args.force else read_stamp(icon_path, SCALE_STAMP_PREFIX)
+            if stamped == key:
+                # Already scaled by a previous run; scaling again would double it
+                print(f"✓ {icon_path} already scaled, skipping...")
+                continue
+            if stamped is not None and stamped[:len(scale_key)] == scale_key:
+                # Already scaled, but with other encode settings: re-save at 1x
+                print(f"✓ {icon_path} already scaled, re-encoding...")
+                tasks.append((icon_path, icon_path, size, compress_level, 1.0))
+                input_mtime = rewritten_from(icon_path, SCALE_STAMP_PREFIX)
+            else:
+                tasks.append((icon_path, icon_path, size, compress_level))
+                input_mtime = os.path.getmtime(icon_path)
+            stamps.append((icon_path, key, input_mtime))
+
+    # Each icon is independent and CPU-bound, so fan out across processes
+    run_jobs(_job, tasks, executor)
+
+    optimize_pngs([task[1] for task in tasks])
+
+    # Stamp after optimizing, since oxipng rewrites the files. Recording the
+    # unscaled icon's mtime lets the circular pass recognize its own output.
+    for icon_path, key, input_mtime in stamps:
+        write_stamp(icon_path, key, SCALE_STAMP_PREFIX, input_mtime)
 
     print("\n✅ All Android icons scaled successfully!")
     print("📱 Rebuild the Android app to see the larger RUNSTR logo.")